@@ -0,0 +1,241 @@
+"""Shared prediction core for the ChurnGuard frontends.
+
+Loads the model and encoders exactly once per process and exposes the
+encoding + scoring pipeline, so any UI layer (Gradio, Streamlit, ...) can
+import this module instead of carrying its own copy of the predict logic.
+"""
+import pickle
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# --- 1. LOAD SYSTEM ASSETS ---
+
+class OnnxModel:
+    """Thin sklearn-style wrapper around an onnxruntime session.
+
+    The exported graph (see export_onnx.py) outputs [label, probabilities],
+    so predict/predict_proba keep the exact interface the rest of the app uses.
+    """
+    def __init__(self, path):
+        import onnxruntime as ort
+        # Fully optimize the tree-ensemble graph at load and let ORT fan tree
+        # evaluation out across cores within a single run
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = os.cpu_count() or 1
+        self.sess = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.sess.get_inputs()[0].name
+
+    def predict(self, X):
+        return self.sess.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})[0]
+
+    def predict_proba(self, X):
+        return self.sess.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})[1]
+
+try:
+    # Preferred path: compiled ONNX graph (no pickle opcode execution, faster startup)
+    try:
+        model = OnnxModel("model.onnx")
+    except Exception as onnx_err:
+        print(f"⚠️ ONNX model unavailable ({onnx_err}), falling back to pickle.")
+        with open("customer_churn_model.pkl", "rb") as f:
+            loaded_object = pickle.load(f)
+
+        # Robust model extraction
+        if isinstance(loaded_object, dict):
+            if "model" in loaded_object: model = loaded_object["model"]
+            elif "classifier" in loaded_object: model = loaded_object["classifier"]
+            else: model = list(loaded_object.values())[0]
+        else:
+            model = loaded_object
+
+    # Compact class lists (see export_onnx.py): plain string arrays, no pickle
+    try:
+        _raw = np.load("encoders.npz")
+        encoder_classes = {col: _raw[col] for col in _raw.files}
+    except Exception as npz_err:
+        print(f"⚠️ encoders.npz unavailable ({npz_err}), falling back to pickle.")
+        with open("encoders.pkl", "rb") as f:
+            encoder_classes = {col: enc.classes_ for col, enc in pickle.load(f).items()}
+
+    print("✅ System: ChurnGuard AI loaded successfully.")
+
+except Exception as e:
+    print(f"❌ System Error: {e}")
+    model = None
+    encoder_classes = {}
+
+# --- 2. ENCODING UTILITIES ---
+
+# Precomputed lookup tables so encoding is a plain dict access instead of a
+# sklearn transform call (which wraps every scalar in an array) on every use.
+ENC_MAP = {col: {cls: i for i, cls in enumerate(classes)} for col, classes in encoder_classes.items()}
+ENC_ALIAS = {col.lower(): mapping for col, mapping in ENC_MAP.items()}
+
+def safe_encode(col_name, value):
+    """Safely encodes a value, returning 0 if encoder or key is missing."""
+    mapping = ENC_MAP.get(col_name)
+    if mapping is None:
+        mapping = ENC_ALIAS.get(col_name.lower(), {})
+    return mapping.get(value, 0)
+
+# Integer codes for the fields the UI never exposes, resolved once at import
+# instead of on every prediction. The three overridable "What-If" fields keep
+# their full lookup table.
+_MULTIPLE_LINES_NO = safe_encode("MultipleLines", "No")
+_ONLINE_BACKUP_NO = safe_encode("OnlineBackup", "No")
+_DEVICE_PROTECTION_NO = safe_encode("DeviceProtection", "No")
+_STREAMING_TV_NO = safe_encode("StreamingTV", "No")
+_STREAMING_MOVIES_NO = safe_encode("StreamingMovies", "No")
+_PAPERLESS_YES = safe_encode("PaperlessBilling", "Yes")
+_PAYMENT_ELECTRONIC = safe_encode("PaymentMethod", "Electronic check")
+_CONTRACT_CODES = ENC_MAP.get("Contract", {})
+_TECH_SUPPORT_CODES = ENC_MAP.get("TechSupport", {})
+_ONLINE_SECURITY_CODES = ENC_MAP.get("OnlineSecurity", {})
+_CONTRACT_M2M = _CONTRACT_CODES.get("Month-to-month", 0)
+_TECH_SUPPORT_NO = _TECH_SUPPORT_CODES.get("No", 0)
+_ONLINE_SECURITY_NO = _ONLINE_SECURITY_CODES.get("No", 0)
+
+# Constant (1, 19) float32 template row: the always-constant slots are written
+# once here, and each prediction copies the template instead of building a
+# Python list and re-inferring the dtype. Every call gets its own copy, so
+# concurrent handler threads (the app queue runs one per core) never share a
+# buffer.
+_ROW_TEMPLATE = np.zeros((1, 19), dtype=np.float32)
+_ROW_TEMPLATE[0, 6] = _MULTIPLE_LINES_NO
+_ROW_TEMPLATE[0, 9] = _ONLINE_BACKUP_NO
+_ROW_TEMPLATE[0, 10] = _DEVICE_PROTECTION_NO
+_ROW_TEMPLATE[0, 12] = _STREAMING_TV_NO
+_ROW_TEMPLATE[0, 13] = _STREAMING_MOVIES_NO
+_ROW_TEMPLATE[0, 15] = _PAPERLESS_YES
+_ROW_TEMPLATE[0, 16] = _PAYMENT_ELECTRONIC
+
+def create_feature_array(gender, senior, partner, dependents, tenure, phone, internet, monthly, total, contract="Month-to-month", tech_support="No", online_security="No"):
+    """Returns a fresh copy of the 19-column template row, filled in for one customer."""
+    buf = _ROW_TEMPLATE.copy()
+    row = buf[0]
+    # Contract, TechSupport, OnlineSecurity can be overridden for "What-If"
+    # analysis; the remaining hidden fields are baked into the template above
+    row[0] = safe_encode("gender", gender)
+    row[1] = 1 if senior == "Yes" else 0
+    row[2] = safe_encode("Partner", partner)
+    row[3] = safe_encode("Dependents", dependents)
+    row[4] = float(tenure)
+    row[5] = safe_encode("PhoneService", phone)
+    row[7] = safe_encode("InternetService", internet)
+    row[8] = _ONLINE_SECURITY_CODES.get(online_security, 0)
+    row[11] = _TECH_SUPPORT_CODES.get(tech_support, 0)
+    row[14] = _CONTRACT_CODES.get(contract, 0)
+    row[17] = float(monthly)
+    row[18] = float(total)
+    return buf
+
+def encode_column(col_name, series):
+    """Vectorized safe_encode for whole CSV columns: one C-level pandas map
+    per column instead of N Python calls (unknown labels -> 0)."""
+    mapping = ENC_MAP.get(col_name)
+    if mapping is None:
+        mapping = ENC_ALIAS.get(col_name.lower())
+    if not mapping:
+        return np.zeros(len(series), dtype=np.int8)
+    return series.astype(str).map(mapping).fillna(0).astype(np.int8).values
+
+# --- 3. SCORING ---
+
+@lru_cache(maxsize=4096)
+def score_customer(gender, senior, partner, dependents, tenure, phone, internet, monthly, total):
+    """Cached numeric core: returns (pred, prob, new_prob) for a customer profile.
+
+    new_prob is the "What-If" scenario (15% discount + Tech Support + One year
+    contract). Inputs are bucketed by the caller so repeat clicks and slider
+    jitter hit the cache instead of re-running the model.
+    """
+    # Score base + scenario in one (2, 19) call instead of three model calls
+    X = np.empty((2, 19), dtype=np.float32)
+    X[0] = create_feature_array(gender, senior, partner, dependents, tenure, phone, internet, monthly, total)
+    X[1] = create_feature_array(gender, senior, partner, dependents, tenure, phone, internet, monthly * 0.85, total, contract="One year", tech_support="Yes")
+    probs = model.predict_proba(X)[:, 1]
+    prob, new_prob = probs[0], probs[1]
+    pred = 1 if prob >= 0.5 else 0
+
+    return pred, prob, new_prob
+
+# Below this many rows the thread-pool spin-up costs more than it saves
+_PARALLEL_MIN_ROWS = 2048
+
+def predict_proba_batch(X):
+    """Churn probabilities for an (N, 19) matrix, chunked across CPU cores.
+
+    The model's native code releases the GIL, so plain threads scale; small
+    inputs go through a single direct call.
+    """
+    n_jobs = os.cpu_count() or 1
+    if len(X) < _PARALLEL_MIN_ROWS or n_jobs == 1:
+        return model.predict_proba(X)[:, 1]
+    from joblib import Parallel, delayed
+    chunks = np.array_split(X, n_jobs)
+    return np.concatenate(
+        Parallel(n_jobs=n_jobs, prefer="threads")(delayed(lambda c: model.predict_proba(c)[:, 1])(c) for c in chunks)
+    )
+
+# The 9 CSV columns a prediction actually depends on (also the dedup key)
+_KEY_COLS = ['gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure', 'PhoneService', 'InternetService', 'MonthlyCharges', 'TotalCharges']
+
+def build_feature_matrix(df):
+    """Vectorized encode of a DataFrame into the (N, 19) matrix the model expects."""
+    # Deferred so the dashboard path never pays the pandas import cost
+    import pandas as pd
+
+    n = len(df)
+
+    # Pull out columns with the same defaults as before (using get-style fallbacks for safety)
+    def col(name, default):
+        return df[name] if name in df.columns else pd.Series([default] * n)
+
+    # Fill one preallocated (N, 19) float32 matrix instead of looping rows
+    X = np.empty((n, 19), dtype=np.float32)
+    X[:, 0] = encode_column("gender", col('gender', 'Male'))
+    X[:, 1] = col('SeniorCitizen', 0).astype(int).values
+    X[:, 2] = encode_column("Partner", col('Partner', 'No'))
+    X[:, 3] = encode_column("Dependents", col('Dependents', 'No'))
+    X[:, 4] = col('tenure', 0).astype(float).values
+    X[:, 5] = encode_column("PhoneService", col('PhoneService', 'No'))
+    X[:, 6] = _MULTIPLE_LINES_NO
+    X[:, 7] = encode_column("InternetService", col('InternetService', 'No'))
+    X[:, 8] = _ONLINE_SECURITY_NO
+    X[:, 9] = _ONLINE_BACKUP_NO
+    X[:, 10] = _DEVICE_PROTECTION_NO
+    X[:, 11] = _TECH_SUPPORT_NO
+    X[:, 12] = _STREAMING_TV_NO
+    X[:, 13] = _STREAMING_MOVIES_NO
+    X[:, 14] = _CONTRACT_M2M
+    X[:, 15] = _PAPERLESS_YES
+    X[:, 16] = _PAYMENT_ELECTRONIC
+    X[:, 17] = col('MonthlyCharges', 0).astype(float).values
+    X[:, 18] = col('TotalCharges', 0).astype(float).values
+    return X
+
+def score_dataframe(df):
+    """Runs the vectorized encode + predict pipeline on one DataFrame (chunk).
+
+    Rows with an identical customer profile (repeat snapshots of the same
+    account) are scored once and the result broadcast back via a merge.
+    """
+    key_cols = [c for c in _KEY_COLS if c in df.columns]
+    if key_cols:
+        uniq = df[key_cols].drop_duplicates()
+        if len(uniq) < len(df):
+            probs = predict_proba_batch(build_feature_matrix(uniq.reset_index(drop=True)))
+            uniq = uniq.assign(
+                Prediction=np.where(probs >= 0.5, "Churn", "No Churn"),
+                Churn_Probability=np.asarray(probs, dtype=np.float64).round(4),
+            )
+            return df.merge(uniq, on=key_cols, how='left')
+
+    # No duplicates (or no recognizable columns): score every row directly
+    probs = predict_proba_batch(build_feature_matrix(df))
+    df['Prediction'] = np.where(probs >= 0.5, "Churn", "No Churn")
+    df['Churn_Probability'] = probs.astype(np.float64).round(4)
+    return df
@@ -0,0 +1,42 @@
+"""One-off export of the trained assets for serving.
+
+Run once after (re)training:  python export_onnx.py
+Writes model.onnx (served through onnxruntime instead of unpickling the
+sklearn model) and encoders.npz (just the class lists, loaded without the
+pickle machinery).
+"""
+import pickle
+
+import numpy as np
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+with open("customer_churn_model.pkl", "rb") as f:
+    loaded_object = pickle.load(f)
+
+if isinstance(loaded_object, dict):
+    if "model" in loaded_object: model = loaded_object["model"]
+    elif "classifier" in loaded_object: model = loaded_object["classifier"]
+    else: model = list(loaded_object.values())[0]
+else:
+    model = loaded_object
+
+onnx_model = convert_sklearn(
+    model,
+    initial_types=[("input", FloatTensorType([None, 19]))],
+    options={id(model): {"zipmap": False}},
+)
+
+with open("model.onnx", "wb") as f:
+    f.write(onnx_model.SerializeToString())
+
+print("✅ Exported model.onnx")
+
+with open("encoders.pkl", "rb") as f:
+    encoders = pickle.load(f)
+
+# astype(str) turns the object-dtype class arrays into plain unicode arrays,
+# so the npz loads with allow_pickle=False
+np.savez("encoders.npz", **{col: enc.classes_.astype(str) for col, enc in encoders.items()})
+
+print("✅ Exported encoders.npz")